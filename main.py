@@ -1,10 +1,12 @@
-from datetime import datetime
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from functools import lru_cache, partial
+from io import BytesIO
 import logging
 import logging.config
-from math import floor, log
 from os.path import expanduser
-from re import match as re_match, search as re_search
-from time import strftime, time, gmtime
+import re
 from typing import Any, Callable, Optional
 
 from lxml import etree
@@ -12,6 +14,8 @@ import mariadb
 import pywikibot as pwb
 from pywikibot.exceptions import UnknownSiteError, UnknownFamilyError
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
 logging.config.fileConfig('logging.conf')
@@ -21,6 +25,7 @@ SITE = pwb.Site('wikidata', 'wikidata')
 REPO = SITE.data_repository()
 
 WIKIDATA_API_ENDPOINT = 'https://www.wikidata.org/w/api.php'
+USER_AGENT = 'msynbot.patrol-bot (https://github.com/MisterSynergy/patrol_bot)'
 DB_PARAMS = {
     'host' : 'wikidatawiki.analytics.db.svc.wikimedia.cloud',
     'database' : 'wikidatawiki_p',
@@ -28,6 +33,27 @@ DB_PARAMS = {
 }
 
 DAY_LIMIT = None # int or None; days
+CHECK_WORKERS = 3 # number of revisions evaluated concurrently; keep small (API etiquette, 100m CPU limit)
+ENTITY_BATCH_SIZE = 50 # max number of ids per wbgetentities request
+
+HTTP_SESSION = requests.Session()
+HTTP_SESSION.headers['User-Agent'] = USER_AGENT
+HTTP_SESSION.mount(
+    'https://',
+    HTTPAdapter(
+        pool_connections=CHECK_WORKERS,
+        pool_maxsize=CHECK_WORKERS,
+        max_retries=Retry(total=3, backoff_factor=0.3)
+    )
+)
+
+# edit summary patterns per action family; groups: (1) number of values, (2) key, (3) value
+SITELINK_SUMMARY = r'^\/\* {action}:(\d+)\|([a-z_]+) \*\/ (.*)$'
+TERM_SUMMARY = r'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
+CLIENT_SUMMARY = r'^\/\* {action}:(\d+)\|\|([a-z-]+) \*\/ (.*)$'
+
+DEL_TEXT = etree.XPath('./div/del/text()', smart_strings=False) # applied to diff table cells
+INS_TEXT = etree.XPath('./div/ins/text()', smart_strings=False)
 
 # TODO:
 # sitelink moves
@@ -42,19 +68,49 @@ DAY_LIMIT = None # int or None; days
 
 #### database management
 class WikidataReplica:
+    connection:Optional[mariadb.connections.Connection] = None
+
+    @classmethod
+    def connect(cls) -> None:
+        cls.close()
+        cls.connection = mariadb.connect(**DB_PARAMS)
+
+    @classmethod
+    def close(cls) -> None:
+        if cls.connection is None:
+            return
+
+        try:
+            cls.connection.close()
+        except mariadb.Error as exception:
+            LOG.warning(exception)
+        cls.connection = None
+
     def __init__(self) -> None:
-        self.replica = mariadb.connect(**DB_PARAMS)
-        self.cursor = self.replica.cursor(dictionary=True)
+        if WikidataReplica.connection is None:
+            WikidataReplica.connect()
+        self.cursor = WikidataReplica.connection.cursor()
 
     def __enter__(self):
         return self.cursor
 
     def __exit__(self, exc_type, exc_val, exc_tb):
         self.cursor.close()
-        self.replica.close()
 
 
-def query_mediawiki(query:str, params:Optional[tuple[Any]]=None) -> list[dict[str, Any]]:
+atexit.register(WikidataReplica.close)
+
+
+def query_mediawiki(query:str, params:Optional[tuple[Any]]=None) -> list[tuple[Any, ...]]:
+    try:
+        return _query_mediawiki(query, params)
+    except (mariadb.OperationalError, mariadb.InterfaceError) as exception: # e.g. server has gone away, lost connection; retry once
+        LOG.warning(exception)
+        WikidataReplica.connect()
+        return _query_mediawiki(query, params)
+
+
+def _query_mediawiki(query:str, params:Optional[tuple[Any]]=None) -> list[tuple[Any, ...]]:
     with WikidataReplica() as db_cursor:
         if params is None:
             db_cursor.execute(query)
@@ -65,45 +121,48 @@ def query_mediawiki(query:str, params:Optional[tuple[Any]]=None) -> list[dict[st
     return result
 
 
-def get_site_object(dbname:str) -> pwb.site._basesite.BaseSite:
+@lru_cache(maxsize=None)
+def get_site_object(dbname:str) -> Optional[pwb.site._basesite.BaseSite]:
+    # unknown dbnames are cached as None, so that they are resolved and logged only once
     try:
         site = pwb.site.APISite.fromDBName(dbname)
     except (UnknownFamilyError, UnknownSiteError) as exception:
-        LOG.warn(exception, dbname)
-        raise RuntimeWarning from exception
+        LOG.warning(f'{dbname}: {exception}')
+        return None
 
     return site
 
 
 #### generic patrolling function
+def patrol_revision(revision_id:int) -> Optional[dict[str, Any]]:
+    for patrol in SITE.patrol(revid=revision_id): # generator with at most one item
+        return patrol
+
+    return None
+
+
 def patrol_revisions(rev_ids:list) -> None:
     cnt = len(rev_ids)
     if cnt==0:
         return
 
-    digits = floor(log(cnt, 10))+1
-
-    try:
-        patrols = SITE.patrol(revid=rev_ids) # "patrols" is a generator
-    except pwb.exceptions.APIError as exception:
-        LOG.warning(exception)
-        return
+    digits = len(str(cnt))
 
     done = 0
-    while True:
+    for revision_id in rev_ids:
         try:
-            try:
-                patrol = next(patrols)
-            except pwb.exceptions.APIError as exception:
-                LOG.warning(exception)
-            except pwb.exceptions.Error as exception:
-                LOG.warning(exception)
-            else:
-                done += 1
-                LOG.info(f'({done:{digits}d}/{cnt:{digits}d}) Patrolled rc_id {patrol["rcid"]}' \
-                         f' of page {patrol["title"]} (ns{patrol["ns"]})')
-        except StopIteration:
-            break
+            patrol = patrol_revision(revision_id)
+        except pwb.exceptions.APIError as exception:
+            LOG.warning(exception)
+        except pwb.exceptions.Error as exception:
+            LOG.warning(exception)
+        else:
+            if patrol is None:
+                continue
+
+            done += 1
+            LOG.info(f'({done:{digits}d}/{cnt:{digits}d}) Patrolled rc_id {patrol["rcid"]}' \
+                     f' of page {patrol["title"]} (ns{patrol["ns"]})')
 
 
 #### reverted revisions
@@ -119,7 +178,7 @@ WHERE
   AND ct_tag_id=674""" # 674=mw-reverted
 
     query_result = query_mediawiki(sql)
-    rev_ids = [ elem['rc_this_oldid'] for elem in query_result ]
+    rev_ids = [ rc_this_oldid for _, rc_this_oldid in query_result ]
     return rev_ids
 
 
@@ -134,8 +193,7 @@ def patrol_reverted_revisions() -> None:
 def get_revisions_in_redirected_items() -> list:
     sql = """SELECT
   rc_id,
-  rc_this_oldid,
-  comment_text
+  rc_this_oldid
 FROM
   recentchanges
     JOIN page ON rc_cur_id=page_id
@@ -143,16 +201,11 @@ FROM
 WHERE
   rc_patrolled=0
   AND rc_namespace=0
-  AND page_is_redirect=1"""
+  AND page_is_redirect=1
+  AND comment_text NOT REGEXP 'wbmergeitems-to|wbmergeitems-from|wbcreateredirect'"""
 
     query_result = query_mediawiki(sql)
-    rev_ids = []
-    for elem in query_result:
-        if re_search(
-            r'(wbmergeitems\-to|wbmergeitems\-from|wbcreateredirect)',
-            elem['comment_text'].decode('utf8')
-        ) is None:
-            rev_ids.append(elem['rc_this_oldid'])
+    rev_ids = [ rc_this_oldid for _, rc_this_oldid in query_result ]
     return rev_ids
 
 
@@ -164,83 +217,127 @@ def patrol_revisions_redirected_items() -> None:
 
 
 #### generic processors
-def query_revision_subset(action:str, limit=None) -> list[dict[str, Any]]:
+def query_revision_subset(action:str, limit=None) -> list[tuple[int, int, str, str]]:
     if limit is None:
-        query_limit = '\n'
+        timestmp = '00000000000000' # no limit
     else:
-        timestmp = strftime('%Y%m%d', gmtime(time()-limit*86400) )
-        query_limit = f'\n  AND rc_timestamp>{timestmp}000000'
+        timestmp = (datetime.utcnow() - timedelta(days=limit)).strftime('%Y%m%d000000')
 
-    sql = f"""SELECT
+    sql = """SELECT
   rc_id,
   rc_this_oldid,
-  rc_title,
-  comment_text
+  CONVERT(rc_title USING utf8mb4) AS rc_title,
+  CONVERT(comment_text USING utf8mb4) AS comment_text
 FROM
   recentchanges
     JOIN comment_recentchanges ON rc_comment_id=comment_id
 WHERE
   rc_patrolled=0
-  AND rc_namespace=0{query_limit}
-  AND comment_text LIKE '/* {action}:%'"""
+  AND rc_namespace=0
+  AND rc_timestamp>%s
+  AND comment_text LIKE %s"""
+
+    return query_mediawiki(sql, (timestmp, f'/* {action}:%'))
+
 
-    return query_mediawiki(sql)
+def prefetch_item_pages(qids:list[str]) -> dict[str, pwb.ItemPage]:
+    # load item contents with one wbgetentities request per ENTITY_BATCH_SIZE items
+    item_pages:dict[str, pwb.ItemPage] = {}
+    if len(qids)==0:
+        return item_pages
+
+    try:
+        for item_page in REPO.preload_entities([ pwb.ItemPage(REPO, qid) for qid in qids ], groupsize=ENTITY_BATCH_SIZE):
+            item_pages[item_page.getID()] = item_page
+    except pwb.exceptions.Error as exception: # missing items are loaded individually by the decision functions
+        LOG.warning(exception)
+
+    return item_pages
 
 
-def process_revision_subset(action:str, pattern:str, check_function:Callable) -> None:
+def evaluate_revision(compiled_pattern:re.Pattern, check_function:Callable, value_from_diff:bool, item_pages:dict[str, pwb.ItemPage], row:tuple[int, int, str, str]) -> Optional[tuple[str, int, str, Any]]:
+    # row: (rc_id, rc_this_oldid=revision_id, rc_title=qid, comment_text=edit_summary)
+    # returns (qid, revision_id, key, value) if the revision should be patrolled, otherwise None
+    _, revision_id, qid, comment_text = row
+
+    match = compiled_pattern.match(comment_text)
+    if match is None: # cannot process
+        return None
+
+    key = match.group(2) # language, project identifier, etc
+    value = match.group(3) # modified value
+
+    if value_from_diff is True: # e.g. alias modifications; the edit summary does not contain all values
+        try:
+            diff = get_revision_diff(revision_id)
+            value = scrape_aliases_from_diff(diff)
+        except RuntimeError:  # e.g. empty diff
+            value = None
+
+    if check_function(qid=qid, key=key, value=value, item_page=item_pages.get(qid)) is not True:
+        return None
+
+    return qid, revision_id, key, value
+
+
+def process_revision_subset(action:str, compiled_pattern:re.Pattern, check_function:Callable, *, value_from_diff:bool=False, prefetch:bool=True) -> None:
     limit = DAY_LIMIT
     query_result = query_revision_subset(action, limit)
-    for i, elem in enumerate(query_result, start=1): # elem: dict with keys rc_id, rc_this_oldid=rev_id, rc_title=qid, comment_text=edit_summary)
-        match = re_match(
-            pattern,
-            elem['comment_text'].decode('utf8')
-        )
-        if match is None: # cannot process
-            continue
-
-        qid = elem['rc_title'].decode('utf8')
-        revision_id = elem['rc_this_oldid']
-        key = match.group(2) # language, project identifier, etc
-        value = match.group(3) # modified value
-
-        if action.startswith('wbsetaliases-'): # special treatment for alias modifications
-            try:
-                diff = get_revision_diff(revision_id)
-            except RuntimeError:
-                value = None
-
-            try:
-                value = scrape_aliases_from_diff(diff)
-            except RuntimeError:  # e.g. empty diff
-                value = None
-
-        if check_function(qid=qid, key=key, value=value) is True:
-            LOG.info(f'{i}/{len(query_result)}, {qid}, {key}, {value}, {next(SITE.patrol(revid=revision_id))}')  # process generator with one item
-        else:
-            if i%100 == 0:
-                LOG.info(f'Progress: {i}/{len(query_result)}')
+    cnt = len(query_result)
+
+    # decision functions are dominated by API latency and independent of each other;
+    # patrolling remains in this thread
+    with ThreadPoolExecutor(max_workers=CHECK_WORKERS) as executor:
+        for offset in range(0, cnt, ENTITY_BATCH_SIZE): # chunks keep the number of loaded items small
+            chunk = query_result[offset:offset+ENTITY_BATCH_SIZE]
+
+            item_pages:dict[str, pwb.ItemPage] = {}
+            if prefetch is True:
+                item_pages = prefetch_item_pages(sorted({ qid for _, _, qid, _ in chunk }))
+
+            evaluations = executor.map(
+                partial(evaluate_revision, compiled_pattern, check_function, value_from_diff, item_pages),
+                chunk
+            )
+
+            for i, evaluation in enumerate(evaluations, start=offset+1):
+                if evaluation is not None:
+                    qid, revision_id, key, value = evaluation
+                    try:
+                        patrol = patrol_revision(revision_id)
+                    except pwb.exceptions.Error as exception:
+                        LOG.warning(f'{i}/{cnt}, {qid}, {key}, {value}, {exception}')
+                    else:
+                        LOG.info(f'{i}/{cnt}, {qid}, {key}, {value}, {patrol}')
+                else:
+                    if i%100 == 0:
+                        LOG.info(f'Progress: {i}/{cnt}')
 
 
 #### helpers
 def get_revision_diff(revision_id:int) -> str:
-    response = requests.get(
-        WIKIDATA_API_ENDPOINT,
-        params={
-            'action' : 'compare',
-            'fromrev' : str(revision_id),
-            'torelative' : 'prev',
-            'format' : 'json'
-        }
-    )
-
-    payload = response.json()
+    try:
+        response = HTTP_SESSION.get(
+            WIKIDATA_API_ENDPOINT,
+            params={
+                'action' : 'compare',
+                'fromrev' : str(revision_id),
+                'torelative' : 'prev',
+                'format' : 'json',
+                'formatversion' : '2'
+            },
+            timeout=30
+        )
+        payload = response.json()
+    except requests.RequestException as exception: # includes timeouts and invalid JSON
+        raise RuntimeError(f'Unsuccessful API call for rev {revision_id}') from exception
 
     if payload.get('compare') is None:
         raise RuntimeError(f'Unsuccessful API call ("compare" key missing for rev {revision_id})')
-    if payload.get('compare').get('*') is None:
-        raise RuntimeError(f'Unsuccessful API call ("*" key missing for rev {revision_id})')
+    if payload.get('compare').get('body') is None:
+        raise RuntimeError(f'Unsuccessful API call ("body" key missing for rev {revision_id})')
 
-    return payload.get('compare').get('*') # this is a HTML string representation of the diff
+    return payload.get('compare').get('body') # this is a HTML string representation of the diff
 
 
 def scrape_aliases_from_diff(diff:str) -> dict[str, list[str]]:
@@ -249,61 +346,78 @@ def scrape_aliases_from_diff(diff:str) -> dict[str, list[str]]:
 
     aliases:dict[str, list[str]] = { 'add' : [], 'remove' : [] }
 
-    tree = etree.fromstring(diff, etree.HTMLParser())
-    try:
-        tr_tags = tree.xpath('//tr') # list of lxml.etree._Element
-    except AttributeError as exception:
-        raise RuntimeError('xpath attribute missing') from exception
+    context = etree.iterparse(
+        BytesIO(diff.encode('utf-8')),
+        events=('end',),
+        tag='tr',
+        html=True,
+        encoding='utf-8', # the diff fragment has no charset declaration
+        recover=True,
+        remove_blank_text=True
+    )
 
     process_table_cells = False
-    for i, tr_tag in enumerate(tr_tags, start=1):
-        td_tags = tr_tag.findall('td') # list of lxml.etree._Element
-        for td_tag in td_tags:
-            td_cls = td_tag.attrib.get('class')
-            td_txt = str(td_tag.text)
+    i = 0
+    try:
+        for i, (_, tr_tag) in enumerate(context, start=1):
+            for td_tag in tr_tag.iterchildren('td'):
+                td_cls = td_tag.attrib.get('class')
+                td_txt = str(td_tag.text)
+
+                if i%2 == 1: # odd header lines
+                    if td_cls != 'diff-lineno': # ignore then
+                        process_table_cells=False
+                        continue
 
-            if i%2 == 1: # odd header lines
-                if td_cls != 'diff-lineno': # ignore then
-                    process_table_cells=False
-                    continue
+                    process_table_cells = td_txt.startswith('aliases / ')
 
-                process_table_cells = td_txt.startswith('aliases / ')
+                else: # even content lines
+                    if process_table_cells is not True:
+                        continue
 
-            else: # even content lines
-                if process_table_cells is not True:
-                    continue
+                    if td_cls=='diff-deletedline':
+                        aliases['remove'].extend(DEL_TEXT(td_tag))
+                    if td_cls=='diff-addedline':
+                        aliases['add'].extend(INS_TEXT(td_tag))
 
-                if td_cls=='diff-deletedline':
-                    aliases['remove'].append(td_tag.find('div').find('del').text)
-                if td_cls=='diff-addedline':
-                    aliases['add'].append(td_tag.find('div').find('ins').text)
+            # release processed rows, so that only the current one is kept in memory
+            tr_tag.clear()
+            while tr_tag.getprevious() is not None:
+                del tr_tag.getparent()[0]
+    except etree.XMLSyntaxError as exception:
+        raise RuntimeError('Cannot parse diff') from exception
+
+    if i == 0:
+        raise RuntimeError('No table rows found in diff')
 
     return aliases
 
 
 #### internal decision functions
-def should_patrol_sitelink_removal(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_sitelink_removal(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* the removed sitelink has meanwhile been added to this item again
     #* the removed sitelink page has been deleted meanwhile
     #* the removed sitelink has been added to another item meanwhile (disputable)
 
     ## first attempt: check whether the sitelink in question is in the item
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage():
+    except pwb.exceptions.IsRedirectPageError:
         return False
 
-    item_page.get()
+    sitelinks = item_page.sitelinks
 
-    if not item_page.sitelinks:
+    if not sitelinks:
         return False
 
     try:
-        connected_sitelink = item_page.sitelinks.get(key)
+        connected_sitelink = sitelinks.get(key)
     except pwb.exceptions.NoUsername:
         return False
 
@@ -311,10 +425,8 @@ def should_patrol_sitelink_removal(qid:str='', key:str='', value:str='') -> bool
         return True # removed sitelink already present again
 
     ## second attempt: check which item is connected to the sitelink
-    try:
-        site = get_site_object(key)
-    except RuntimeWarning as exception:
-        LOG.warning(f'{key}: {exception}')
+    site = get_site_object(key)
+    if site is None:
         return False
 
     project_page = pwb.Page(
@@ -342,7 +454,7 @@ def should_patrol_sitelink_removal(qid:str='', key:str='', value:str='') -> bool
     return False
 
 
-def should_patrol_sitelink_addition(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_sitelink_addition(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect page
     #* item does not have any sitelinks (i.e. the added sitelink is gone as well)
@@ -354,24 +466,26 @@ def should_patrol_sitelink_addition(qid:str='', key:str='', value:str='') -> boo
     #* sitelink has been moved to another item
 
     ## first attempt: check whether the sitelink in question is in the item
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    sitelinks = item_page.sitelinks
 
-    if not item_page.sitelinks:
+    if not sitelinks:
         return True # sitelink was meanwhile removed again
 
-    if not key in item_page.sitelinks:
+    if not key in sitelinks:
         return True # no such sitelink any longer present
 
     try:
-        connected_sitelink = item_page.sitelinks.get(key)
+        connected_sitelink = sitelinks.get(key)
     except pwb.exceptions.NoUsernameError as exception:
         LOG.warning(exception)
         return False
@@ -384,10 +498,8 @@ def should_patrol_sitelink_addition(qid:str='', key:str='', value:str='') -> boo
         return False
 
     ## second attempt: check which item is connected to the sitelink
-    try:
-        site = get_site_object(key)
-    except RuntimeWarning as exception:
-        LOG.warning(f'{key}: {exception}')
+    site = get_site_object(key)
+    if site is None:
         return False
 
     project_page = pwb.Page(
@@ -417,94 +529,100 @@ def should_patrol_sitelink_addition(qid:str='', key:str='', value:str='') -> boo
     return False
 
 
-def should_patrol_label_removal(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_label_removal(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect
     #* item has this label again
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
     try:
-        if not item_page.exists():
-            return False
+        item_page.get()
+    except pwb.exceptions.NoPageError:
+        return False
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
+        return True
     except ValueError:
         LOG.warning(f'item page does not exist: {qid}, {key}, {value}')
         return False
 
-    if item_page.isRedirectPage():
-        return True # item meanwhile redirects
+    labels = item_page.labels
 
-    item_page.get()
-
-    if not item_page.labels:
+    if not labels:
         return False
 
-    if not key in item_page.labels:
+    if not key in labels:
         return False
 
-    if item_page.labels.get(key) == value:
+    if labels.get(key) == value:
         return True # removed label meanwhile present again
 
     return False
 
 
-def should_patrol_label_modification(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_label_modification(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is redirect
     #* item has no labels
     #* item has no label in this language
     #* item has a different label in this language
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    labels = item_page.labels
 
-    if not item_page.labels:
+    if not labels:
         return True # no labels, i.e. label in question has been removed again
 
-    if not key in item_page.labels:
+    if not key in labels:
         return True # no label in this language any longer present
 
-    if item_page.labels.get(key) is not None and item_page.labels.get(key) != value:
+    current_label = labels.get(key)
+    if current_label is not None and current_label != value:
         return True # different label meanwhile present
 
     return False
 
 
-def should_patrol_description_removal(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_description_removal(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect
     #* item has this description again
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
+        return True
 
-    if item_page.isRedirectPage():
-        return True # item meanwhile redirects
-
-    item_page.get()
+    descriptions = item_page.descriptions
 
-    if not item_page.descriptions:
+    if not descriptions:
         return False
 
-    if not key in item_page.descriptions:
+    if not key in descriptions:
         return False
 
-    if item_page.descriptions.get(key) == value:
+    if descriptions.get(key) == value:
         return True # removed description meanwhile present again
 
     return False
 
 
-def should_patrol_description_modification(qid:str='', key:str='', value:str='') -> bool:
+def should_patrol_description_modification(qid:str='', key:str='', value:str='', item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is redirect
     #* item has no descriptions
@@ -533,29 +651,32 @@ def should_patrol_description_modification(qid:str='', key:str='', value:str='')
 
     value = tidy_description(value)
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    descriptions = item_page.descriptions
 
-    if not item_page.descriptions:
+    if not descriptions:
         return True # no descriptions, i.e. description in question has been removed again
 
-    if not key in item_page.descriptions:
+    if not key in descriptions:
         return True # no description in this language any longer present
 
-    if item_page.descriptions.get(key) is not None and item_page.descriptions.get(key) != value:
+    current_description = descriptions.get(key)
+    if current_description is not None and current_description != value:
         return True # different description meanwhile present
 
     return False
 
 
-def should_patrol_alias_additions(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None) -> bool:
+def should_patrol_alias_additions(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None, item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect
     #* item has no aliases
@@ -567,30 +688,33 @@ def should_patrol_alias_additions(qid:str='', key:str='', value:Optional[dict[st
     if len(value.get('remove', [])) > 0: # should not happen here
         return False
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    aliases = item_page.aliases
 
-    if not item_page.aliases:
+    if not aliases:
         return True # no aliases, i.e. aliases in question have been removed again
 
-    if not key in item_page.aliases:
+    if not key in aliases:
         return True # no aliases in this language any longer present
 
-    aliases_still_existing = [ alias for alias in value.get('add', []) if alias in item_page.aliases.get(key) ]
+    current_aliases = aliases.get(key)
+    aliases_still_existing = [ alias for alias in value.get('add', []) if alias in current_aliases ]
     if len(aliases_still_existing) == 0:
         return True # none of the added aliases is still present
 
     return False
 
 
-def should_patrol_alias_removals(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None) -> bool:
+def should_patrol_alias_removals(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None, item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect
     #* none of the removed aliases is still missing in this language
@@ -600,58 +724,61 @@ def should_patrol_alias_removals(qid:str='', key:str='', value:Optional[dict[str
     if len(value.get('add', [])) > 0: # should not happen here
         return False
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    aliases = item_page.aliases
 
-    if not item_page.aliases:
+    if not aliases:
         return False # no aliases, i.e. aliases in question have not been added again
 
-    if not key in item_page.aliases:
+    if not key in aliases:
         return False # still no aliases in this language present
 
-    aliases_still_missing = [ alias for alias in value.get('remove', []) if alias not in item_page.aliases.get(key) ]
+    current_aliases = aliases.get(key)
+    aliases_still_missing = [ alias for alias in value.get('remove', []) if alias not in current_aliases ]
     if len(aliases_still_missing) == 0:
         return True # none of the removed aliases is still missing
 
     return False
 
 
-def should_patrol_alias_modifications(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None) -> bool:
+def should_patrol_alias_modifications(qid:str='', key:str='', value:Optional[dict[str, list[str]]]=None, item_page:Optional[pwb.ItemPage]=None) -> bool:
     # True if:
     #* item is a redirect
     #* none of the removed aliases is still missing, and none of the added aliases is still present
     if value is None: # something went wrong with the diff
         return False
 
-    item_page = pwb.ItemPage(REPO, qid)
+    if item_page is None: # not prefetched
+        item_page = pwb.ItemPage(REPO, qid)
 
-    if not item_page.exists():
+    try:
+        item_page.get()
+    except pwb.exceptions.NoPageError:
         return False
-
-    if item_page.isRedirectPage(): # item meanwhile redirects
+    except pwb.exceptions.IsRedirectPageError: # item meanwhile redirects
         return True
 
-    item_page.get()
+    aliases = item_page.aliases
+    removed_aliases = value.get('remove', [])
 
-    if len(value.get('remove', [])) > 0 and not item_page.aliases:
+    if len(removed_aliases) > 0 and not aliases:
         return False # no aliases, i.e. removed aliases in question have not been added again
 
-    if len(value.get('remove', [])) > 0 and not key in item_page.aliases:
+    if len(removed_aliases) > 0 and not key in aliases:
         return False # removed aliases still not present in this language present
 
-    aliases_still_missing = [ alias for alias in value.get('remove', []) if alias not in item_page.aliases.get(key) ]
-
-    if not item_page.aliases or not key in item_page.aliases:
-        aliases_still_existing = []
-    else:
-        aliases_still_existing = [ alias for alias in value.get('add', []) if alias in item_page.aliases.get(key) ]
+    current_aliases = aliases.get(key, []) if aliases else []
+    aliases_still_missing = [ alias for alias in removed_aliases if alias not in current_aliases ]
+    aliases_still_existing = [ alias for alias in value.get('add', []) if alias in current_aliases ]
 
     if len(aliases_still_missing) == 0 and len(aliases_still_existing) == 0:
         return True # none of the removed aliases is still missing, and none of the added aliases is still present
@@ -659,136 +786,51 @@ def should_patrol_alias_modifications(qid:str='', key:str='', value:Optional[dic
     return False
 
 
-def should_patrol_sitelink_deletion(qid:str='', key:str='', value:Optional[dict]=None) -> bool:
+def should_patrol_sitelink_deletion(qid:str='', key:str='', value:Optional[dict]=None, item_page:Optional[pwb.ItemPage]=None) -> bool:
     return True
 
 
-#### caller functions
-def patrol_sitelink_removals() -> None:
-    action = 'wbsetsitelink-remove'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z_]+) \*\/ (.*)$'
-    check_function = should_patrol_sitelink_removal
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_sitelink_additions() -> None:
-    action = 'wbsetsitelink-add'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z_]+) \*\/ (.*)$'
-    check_function = should_patrol_sitelink_addition
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_label_additions() -> None:
-    action = 'wbsetlabel-add'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_label_modification
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_label_modifications() -> None:
-    action = 'wbsetlabel-set'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_label_modification
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_label_removals() -> None:
-    action = 'wbsetlabel-remove'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_label_removal
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_description_additions() -> None:
-    action = 'wbsetdescription-add'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_description_modification
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_description_modifications() -> None:
-    action = 'wbsetdescription-set'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_description_modification
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_description_removals() -> None:
-    action = 'wbsetdescription-remove'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_description_removal
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_alias_additions() -> None:
-    action = 'wbsetaliases-add'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_alias_additions
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_alias_removals() -> None:
-    action = 'wbsetaliases-remove'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_alias_removals
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_alias_settings() -> None:
-    action = 'wbsetaliases-set'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_alias_modifications
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_alias_updates() -> None:
-    action = 'wbsetaliases-update'
-    pattern = fr'^\/\* {action}:(\d+)\|([a-z0-9-]+) \*\/ (.*)$'
-    check_function = should_patrol_alias_modifications
-
-    process_revision_subset(action, pattern, check_function)
-
-
-def patrol_sitelink_deletions() -> None:
-    action = 'clientsitelink-remove'
-    pattern = fr'^\/\* {action}:(\d+)\|\|([a-z-]+) \*\/ (.*)$'
-    check_function = should_patrol_sitelink_deletion
-
-    process_revision_subset(action, pattern, check_function)
+#### jobs
+# (description, action, edit summary pattern, check function, value taken from diff, prefetch items)
+REVISION_SUBSET_JOBS:list[tuple[str, str, str, Callable, bool, bool]] = [
+    ('sitelink additions', 'wbsetsitelink-add', SITELINK_SUMMARY, should_patrol_sitelink_addition, False, True),
+    ('sitelink removals', 'wbsetsitelink-remove', SITELINK_SUMMARY, should_patrol_sitelink_removal, False, True),
+    ('sitelink deletions', 'clientsitelink-remove', CLIENT_SUMMARY, should_patrol_sitelink_deletion, False, False),
+    ('label additions', 'wbsetlabel-add', TERM_SUMMARY, should_patrol_label_modification, False, True),
+    ('label removals', 'wbsetlabel-remove', TERM_SUMMARY, should_patrol_label_removal, False, True),
+    ('label modifications', 'wbsetlabel-set', TERM_SUMMARY, should_patrol_label_modification, False, True),
+    ('description additions', 'wbsetdescription-add', TERM_SUMMARY, should_patrol_description_modification, False, True),
+    ('description removals', 'wbsetdescription-remove', TERM_SUMMARY, should_patrol_description_removal, False, True),
+    ('description modifications', 'wbsetdescription-set', TERM_SUMMARY, should_patrol_description_modification, False, True),
+    ('alias additions', 'wbsetaliases-add', TERM_SUMMARY, should_patrol_alias_additions, True, True),
+    ('alias removals', 'wbsetaliases-remove', TERM_SUMMARY, should_patrol_alias_removals, True, True),
+    ('alias settings', 'wbsetaliases-set', TERM_SUMMARY, should_patrol_alias_modifications, True, True),
+    ('alias updates', 'wbsetaliases-update', TERM_SUMMARY, should_patrol_alias_modifications, True, True),
+]
+
+ACTION_PATTERNS:dict[str, re.Pattern] = {
+    action : re.compile(summary_pattern.format(action=action)) for _, action, summary_pattern, *_ in REVISION_SUBSET_JOBS
+}
 
 
 #### main
 def main() -> None:
     SITE.login()
+    WikidataReplica.connect()
 
-    jobs = {
+    jobs:dict[str, Callable] = {
         'reverted revisions' : patrol_reverted_revisions,
         'revisions in redirected items' : patrol_revisions_redirected_items,
-        'sitelink additions' : patrol_sitelink_additions,
-        'sitelink removals' : patrol_sitelink_removals,
-        'sitelink deletions' : patrol_sitelink_deletions,
-        'label additions' : patrol_label_additions,
-        'label removals' : patrol_label_removals,
-        'label modifications' : patrol_label_modifications,
-        'description additions' : patrol_description_additions,
-        'description removals' : patrol_description_removals,
-        'description modifications' : patrol_description_modifications,
-        'alias additions' : patrol_alias_additions,
-        'alias removals' : patrol_alias_removals,
-        'alias settings' : patrol_alias_settings,
-        'alias updates' : patrol_alias_updates,
     }
+    for description, action, _, check_function, value_from_diff, prefetch in REVISION_SUBSET_JOBS:
+        jobs[description] = partial(
+            process_revision_subset,
+            action,
+            ACTION_PATTERNS[action],
+            check_function,
+            value_from_diff=value_from_diff,
+            prefetch=prefetch
+        )
 
     for i, (description, func) in enumerate(jobs.items(), start=1):
         LOG.info(f'{i:2d}/{len(jobs)}: patrol {description}')